@@ -1,19 +1,44 @@
+import re
+import threading
+
 from flask import Flask, request, jsonify
 from utils.retrieve_doc import DocumentRetriever
 from utils.generator import GPTGenerator
 
 app = Flask(__name__)
 
-# Initialize RAG components
-try:
-    retriever = DocumentRetriever()
-    generator = GPTGenerator()
-except Exception as e:
-    raise RuntimeError(f"Failed to initialize components: {e}")
+def _find_relevant_sentence(context: str, query: str):
+    """Return the first sentence mentioning any query keyword, or None.
+
+    Compiles the keywords into one alternation regex so each sentence is
+    scanned in a single pass instead of one `in` check per keyword.
+    """
+    keywords = set(query.lower().split())
+    if not keywords:
+        return None
+    pattern = re.compile("|".join(re.escape(word) for word in keywords))
+    return next((s.strip() for s in context.split(".") if pattern.search(s.lower())), None)
+
+# RAG components are created lazily, once per worker process, and shared
+# across that worker's request threads so they reuse one HTTP pool
+_components = None
+_components_lock = threading.Lock()
+
+def _get_components():
+    global _components
+    if _components is None:
+        with _components_lock:
+            if _components is None:
+                try:
+                    _components = (DocumentRetriever(), GPTGenerator())
+                except Exception as e:
+                    raise RuntimeError(f"Failed to initialize components: {e}")
+    return _components
 
 @app.route('/answer', methods=['POST'])
 def answer_question():
     try:
+        retriever, generator = _get_components()
         data = request.get_json(force=True)
         query = data.get("query", "").strip()
 
@@ -28,23 +53,30 @@ def answer_question():
                 "sources": []
             })
 
-        context = "\n\n".join([doc.get("content", "") for doc in results])
+        # Build context and sources in one pass over the results
+        contents, seen_sources = [], set()
+        sources = []
+        for doc in results:
+            contents.append(doc.get("content", ""))
+            source = doc.get("source", "Unknown")
+            if source not in seen_sources:
+                seen_sources.add(source)
+                sources.append(source)
+        context = "\n\n".join(contents)
+
         answer = generator.generate_answer(query, context)
 
         if len(answer.split()) < 10:
-            relevant_sentences = [
-                s for s in context.split(".")
-                if any(word in s.lower() for word in query.lower().split())
-            ]
-            answer = f"Here’s what I found: {relevant_sentences[0].strip()}." if relevant_sentences else \
+            relevant_sentence = _find_relevant_sentence(context, query)
+            answer = f"Here’s what I found: {relevant_sentence}." if relevant_sentence else \
                      "I don't have that information in the available documents."
 
-        sources = list({doc.get("source", "Unknown") for doc in results})
-
         return jsonify({"answer": answer, "sources": sources})
 
     except Exception as e:
         return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Development only — in production run via gunicorn (see gunicorn.conf.py):
+    #   gunicorn -c gunicorn.conf.py wsgi:app
+    app.run()
\ No newline at end of file
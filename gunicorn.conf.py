@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for the HR RAG chatbot.
+
+The /answer hot path is I/O-bound (Azure embedding + chat round-trips),
+so threaded workers give near-linear concurrency: each worker shares one
+OpenAI HTTP pool across its request threads.
+
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+bind = "0.0.0.0:8000"
+
+worker_class = "gthread"
+workers = 4
+threads = 8
+
+# Import the app before forking so workers share the loaded code pages;
+# the OpenAI clients themselves are created lazily per worker
+preload_app = True
+
+timeout = 60
@@ -1,15 +1,25 @@
 import sys
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
 from pathlib import Path
- 
+
+import numpy as np
+
 import utils.setting as config
 
 from utils.setting import validate_config
 
-from utils.pdf_processor import PDFProcessor
+from utils.pdf_processor import PDFProcessor, prepare_pdf_chunks
 
 from utils.cosmos_db import CosmosVectorDB
- 
+
+from utils.math_kernels import l2_normalize_2d
+
+# Pipeline sizing: extraction is CPU-bound, embedding is network-bound
+EXTRACT_WORKERS = 4
+EMBED_WORKERS = 4
+
 def main():
 
     """Main embedding pipeline."""
@@ -36,12 +46,6 @@ def main():
 
     pdf_processor = PDFProcessor(
 
-        azure_endpoint=config.AZURE_OPENAI_EMBEDDING_ENDPOINT,
-
-        azure_api_key=config.AZURE_OPENAI_EMBEDDING_KEY,
-
-        api_version=config.AZURE_OPENAI_API_VERSION,
-
         embedding_model=config.EMBEDDING_MODEL_DEPLOYMENT
 
     )
@@ -64,13 +68,6 @@ def main():
 
     )
 
-    print("\nDeleting old documents from Cosmos DB...")
-
-    deleted_count = cosmos_db.delete_all_documents()
-
-    print( f"Deleted {deleted_count} old documents.\n")
- 
- 
     # Ensure data directory exists
 
     data_dir = Path(config.DATA_DIR)
@@ -99,53 +96,78 @@ def main():
 
     print()
  
-    # Process each PDF
+    # Process all PDFs as a pipeline: extraction/chunking runs in worker
+    # processes (CPU-bound), embedding fans out from I/O threads, and
+    # inserts drain in this thread — so extraction of PDF N+1 overlaps
+    # embedding of PDF N and insertion of PDF N-1
 
     total_documents = 0
 
-    for pdf_file in pdf_files:
-
-        try:
-
-            print(f" Processing {pdf_file.name}...")
-
-            documents = pdf_processor.process_pdf(
-
-                pdf_path=str(pdf_file),
-
-                chunk_size=config.CHUNK_SIZE,
-
-                overlap=config.CHUNK_OVERLAP
-
-            )
-
-            if documents:
-
-                print("\n================Sample document structure:")
+    with ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) as extract_pool, \
+         ThreadPoolExecutor(max_workers=EMBED_WORKERS) as embed_pool:
+
+        extract_futures = {
+            extract_pool.submit(
+                prepare_pdf_chunks,
+                (str(pdf_file), config.CHUNK_SIZE, config.CHUNK_OVERLAP)
+            ): pdf_file
+            for pdf_file in pdf_files
+        }
+
+        # Hand each extracted PDF to the embedding pool as soon as its
+        # chunks are ready
+        embed_futures = {}
+        for future in as_completed(extract_futures):
+            pdf_file = extract_futures[future]
+            try:
+                all_chunks = future.result()
+            except Exception as e:
+                print(f" Error extracting {pdf_file.name}: {e}")
+                continue
+            if not all_chunks:
+                print(f" No documents created from {pdf_file.name}\n")
+                continue
+            print(f" Extracted {len(all_chunks)} chunks from {pdf_file.name}, embedding...")
+            embed_futures[
+                embed_pool.submit(pdf_processor.embed_chunks, str(pdf_file), all_chunks)
+            ] = pdf_file
+
+        # Store each PDF's documents as its embeddings complete
+        for future in as_completed(embed_futures):
+            pdf_file = embed_futures[future]
+            try:
+                documents = future.result()
+            except Exception as e:
+                print(f" Error processing {pdf_file.name}: {e}")
+                continue
+            if not documents:
+                print(f" No documents created from {pdf_file.name}\n")
+                continue
 
-                print(documents[0])
- 
- 
-            if documents:
+            # L2-normalize embeddings in one batch so cosine similarity
+            # reduces to a plain dot product at search time; they stay
+            # float32 until insert_documents serializes them to BSON
+            embeddings = np.vstack([doc["embedding"] for doc in documents])
+            l2_normalize_2d(embeddings)
+            for doc, embedding in zip(documents, embeddings):
+                doc["embedding"] = embedding
 
-                print(f"  Storing {len(documents)} documents in Cosmos DB...")
+            print(f"  Storing {len(documents)} documents in Cosmos DB...")
 
-                inserted = cosmos_db.insert_documents(documents)
+            # Upsert instead of delete-all + reinsert so the vector
+            # index isn't rebuilt from scratch on every run
+            inserted = cosmos_db.insert_documents(documents, upsert=True)
 
-                total_documents += inserted
+            stale = cosmos_db.delete_stale_chunks(pdf_file.name, len(documents))
 
-                print(f"Successfully stored {inserted} documents\n")
+            if stale:
 
-            else:
+                print(f"  Removed {stale} stale chunks from previous runs")
 
-                print(f" No documents created from {pdf_file.name}\n")
- 
-        except Exception as e:
+            total_documents += inserted
 
-            print(f" Error processing {pdf_file.name}: {e}")
+            print(f"Successfully stored {inserted} documents\n")
 
-            continue
- 
     # Summary
 
     print("\n" + "="*70)
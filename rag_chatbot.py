@@ -1,24 +1,45 @@
+import re
+
 from utils.retrieve_doc import DocumentRetriever
 from utils.generator import GPTGenerator
 
 retriever = DocumentRetriever()
 generator = GPTGenerator()
 
+def _find_relevant_sentence(context: str, query: str):
+    """Return the first sentence mentioning any query keyword, or None.
+
+    Compiles the keywords into one alternation regex so each sentence is
+    scanned in a single pass instead of one `in` check per keyword.
+    """
+    keywords = set(query.lower().split())
+    if not keywords:
+        return None
+    pattern = re.compile("|".join(re.escape(word) for word in keywords))
+    return next((s.strip() for s in context.split(".") if pattern.search(s.lower())), None)
+
 def answer_question(query: str) -> str:
     results = retriever.retrieve_documents(query, top_k=3)
     if not results:
         return "I don't have that information in the available documents."
 
-    context = "\n\n".join([doc.get("content", "") for doc in results])
+    # Build context and sources in one pass over the results
+    contents, sources = [], []
+    for doc in results:
+        contents.append(doc.get("content", ""))
+        source = doc.get("source", "Unknown")
+        if source not in sources:
+            sources.append(source)
+    context = "\n\n".join(contents)
+
     answer = generator.generate_answer(query, context)
 
     # If GPT response is empty or too short, fallback to relevant sentence
     if len(answer.split()) < 10:
-        relevant_sentences = [s for s in context.split(".") if any(word in s.lower() for word in query.lower().split())]
-        if relevant_sentences:
-            answer = f"Here’s what I found: {relevant_sentences[0].strip()}."
+        relevant_sentence = _find_relevant_sentence(context, query)
+        if relevant_sentence:
+            answer = f"Here’s what I found: {relevant_sentence}."
         else:
             answer = "I don't have that information in the available documents."
 
-    sources = "\n\n**Sources:**\n" + "\n".join([doc.get("source", "Unknown") for doc in results])
-    return answer + sources
\ No newline at end of file
+    return answer + "\n\n**Sources:**\n" + "\n".join(sources)
\ No newline at end of file
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Shared Azure OpenAI Clients
+===========================
+One place to build the chat and embedding clients so every module reuses
+the same HTTP/2 connection pools instead of each opening its own.
+
+The factories are lru_cache'd: the first caller pays the SDK init cost,
+everyone after gets the warm client (and its keepalive pool) for free.
+
+Author: HR RAG Bot Team
+Date: October 2025
+"""
+
+import functools
+
+import httpx
+from openai import AzureOpenAI, AsyncAzureOpenAI
+
+from utils.setting import (
+    AZURE_OPENAI_EMBEDDING_ENDPOINT,
+    AZURE_OPENAI_EMBEDDING_KEY,
+    AZURE_OPENAI_CHAT_ENDPOINT,
+    AZURE_OPENAI_CHAT_API_KEY,
+    AZURE_OPENAI_API_VERSION
+)
+
+
+def _pool_kwargs() -> dict:
+    """HTTP/2 keepalive pool settings shared by all clients."""
+    return {
+        "http2": True,
+        "limits": httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        "timeout": httpx.Timeout(30.0, connect=2.0)
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def embedding_client() -> AzureOpenAI:
+    """Shared sync client for the embeddings deployment."""
+    return AzureOpenAI(
+        azure_endpoint=AZURE_OPENAI_EMBEDDING_ENDPOINT,
+        api_key=AZURE_OPENAI_EMBEDDING_KEY,
+        api_version=AZURE_OPENAI_API_VERSION,
+        http_client=httpx.Client(**_pool_kwargs())
+    )
+
+
+def async_embedding_client() -> AsyncAzureOpenAI:
+    """Fresh async client for concurrent embedding batches.
+
+    Deliberately NOT cached: httpx.AsyncClient binds its keepalive
+    connections to the event loop that first used them, so a shared
+    client fails with "Event loop is closed" once that loop is gone.
+    Callers own the returned client and must close it when their loop
+    finishes.
+    """
+    return AsyncAzureOpenAI(
+        azure_endpoint=AZURE_OPENAI_EMBEDDING_ENDPOINT,
+        api_key=AZURE_OPENAI_EMBEDDING_KEY,
+        api_version=AZURE_OPENAI_API_VERSION,
+        http_client=httpx.AsyncClient(**_pool_kwargs())
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def chat_client() -> AzureOpenAI:
+    """Shared sync client for the chat deployment."""
+    return AzureOpenAI(
+        azure_endpoint=AZURE_OPENAI_CHAT_ENDPOINT,
+        api_key=AZURE_OPENAI_CHAT_API_KEY,
+        api_version=AZURE_OPENAI_API_VERSION,
+        http_client=httpx.Client(**_pool_kwargs())
+    )
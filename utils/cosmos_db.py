@@ -1,4 +1,5 @@
-from pymongo import MongoClient
+import numpy as np
+from pymongo import InsertOne, MongoClient, ReplaceOne
 from typing import List, Dict
 class CosmosVectorDB:
     """
@@ -126,9 +127,18 @@ class CosmosVectorDB:
             else:
                 print(f" Warning: Could not create vector index: {e}")
                 print("   Index might already exist or will be created automatically")
-    def insert_documents(self, documents: List[Dict]) -> int:
+    # Documents per bulk_write call — keeps each request comfortably
+    # under the server's message size limit
+    BULK_BATCH_SIZE = 500
+
+    def insert_documents(self, documents: List[Dict], upsert: bool = False) -> int:
         """
         Insert documents with embeddings into Cosmos DB.
+
+        Writes go through unordered bulk_write in batches of 500, so the
+        server can apply each batch in parallel and one bad document
+        doesn't abort the rest.
+
         Args:
             documents (List[Dict]): List of documents to insert
                 Each document should have:
@@ -137,8 +147,12 @@ class CosmosVectorDB:
                 - source: Source filename
                 - page: Page number
                 - chunk_index: Chunk identifier
+            upsert (bool): Replace existing documents matching
+                (source, chunk_index) instead of blindly inserting.
+                Use for re-ingestion without wiping the collection
+                (and its vector index) first.
         Returns:
-            int: Number of documents successfully inserted
+            int: Number of documents successfully written
         Example:
             documents = [
                 {
@@ -157,13 +171,64 @@ class CosmosVectorDB:
             for doc in documents:
                 if "content" in doc:
                     doc["text_chunk"] = doc.pop("content")
-            result = self.collection.insert_many(documents)
-            inserted_count = len(result.inserted_ids)
-            print(f"✓ Inserted {inserted_count} documents into Cosmos DB")
-            return inserted_count
+                # Embeddings travel through the pipeline as float32 ndarrays;
+                # convert to plain lists only here, at the BSON boundary
+                embedding = doc.get("embedding")
+                if isinstance(embedding, np.ndarray):
+                    doc["embedding"] = embedding.tolist()
+
+            if upsert:
+                operations = [
+                    ReplaceOne(
+                        {"source": doc["source"], "chunk_index": doc["chunk_index"]},
+                        doc,
+                        upsert=True
+                    )
+                    for doc in documents
+                ]
+            else:
+                operations = [InsertOne(doc) for doc in documents]
+
+            written_count = 0
+            for batch_start in range(0, len(operations), self.BULK_BATCH_SIZE):
+                batch = operations[batch_start:batch_start + self.BULK_BATCH_SIZE]
+                result = self.collection.bulk_write(batch, ordered=False)
+                if upsert:
+                    # matched + upserted covers every successful write; a
+                    # replacement identical to the stored document matches
+                    # with modified_count == 0 but still succeeded
+                    written_count += result.matched_count + result.upserted_count
+                else:
+                    written_count += result.inserted_count
+            print(f"✓ Inserted {written_count} documents into Cosmos DB")
+            return written_count
         except Exception as e:
             print(f" Error inserting documents: {e}")
             return 0
+
+    def delete_stale_chunks(self, source: str, valid_chunk_count: int) -> int:
+        """
+        Remove leftover chunks of a re-ingested source document.
+
+        After upserting a PDF that shrank, chunks beyond the new count
+        would otherwise linger and pollute search results.
+
+        Args:
+            source (str): Source filename the chunks belong to
+            valid_chunk_count (int): Number of chunks just written
+
+        Returns:
+            int: Number of stale chunks removed
+        """
+        try:
+            result = self.collection.delete_many({
+                "source": source,
+                "chunk_index": {"$gte": valid_chunk_count}
+            })
+            return result.deleted_count
+        except Exception as e:
+            print(f" Error deleting stale chunks for {source}: {e}")
+            return 0
     def vector_search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
         """
     Perform vector similarity search to find relevant documents.
@@ -201,6 +266,7 @@ class CosmosVectorDB:
                     "$project": {
                         "_id": 0,                    # Don't return MongoDB ID
                         "content": {"$ifNull": ["$content", "$text_chunk"]},  # Support both field names
+                        "embedding": 1,              # Needed for client-side reranking
                         "source": 1,                 # Return source filename
                         "page": 1,                   # Return page number
                         "chunk_index": 1,            # Return chunk index
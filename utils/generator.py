@@ -11,24 +11,16 @@ Author: HR RAG Bot Team
 Date: October 2025
 """
 
-from openai import AzureOpenAI
-from utils.setting import (
-    AZURE_OPENAI_CHAT_ENDPOINT,
-    AZURE_OPENAI_CHAT_API_KEY,
-    CHAT_MODEL_DEPLOYMENT,
-    AZURE_OPENAI_API_VERSION
-)
+from utils.clients import chat_client
+from utils.setting import CHAT_MODEL_DEPLOYMENT
 
 class GPTGenerator:
     """Generates answers using Azure OpenAI GPT model based on retrieved context."""
 
     def __init__(self):
         print(" Initializing GPT Generator...")
-        self.chat_client = AzureOpenAI(
-            azure_endpoint=AZURE_OPENAI_CHAT_ENDPOINT,
-            api_key=AZURE_OPENAI_CHAT_API_KEY,
-            api_version=AZURE_OPENAI_API_VERSION
-        )
+        # Shared process-wide client (see utils/clients.py)
+        self.chat_client = chat_client()
         print(" GPT Generator initialized successfully!\n")
 
     def generate_answer(self, query: str, context: str) -> str:
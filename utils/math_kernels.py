@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Math Kernels Module
+===================
+Hot numeric kernels for the embedding pipeline.
+
+Uses Numba-compiled kernels when numba is installed (fused loops, one
+cache pass per row) and falls back to plain NumPy otherwise, so numba
+stays an optional dependency.
+
+Author: HR RAG Bot Team
+Date: October 2025
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def l2_normalize_2d(embeddings):
+        """L2-normalize each row of a float32 (N, d) matrix in place.
+
+        Fuses the sum-of-squares, rsqrt and scale into one pass per row,
+        avoiding the extra write/read cycle of norm-then-divide.
+        """
+        for i in prange(embeddings.shape[0]):
+            total = 0.0
+            for j in range(embeddings.shape[1]):
+                total += embeddings[i, j] * embeddings[i, j]
+            inv = 1.0 / math.sqrt(total + 1e-12)
+            for j in range(embeddings.shape[1]):
+                embeddings[i, j] *= inv
+        return embeddings
+
+else:
+
+    def l2_normalize_2d(embeddings):
+        """L2-normalize each row of a float32 (N, d) matrix in place (NumPy fallback)."""
+        norms = np.sqrt(np.einsum("ij,ij->i", embeddings, embeddings) + 1e-12)
+        embeddings /= norms[:, np.newaxis]
+        return embeddings
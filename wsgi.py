@@ -0,0 +1,6 @@
+"""WSGI entry point for production servers (gunicorn, uWSGI, ...)."""
+
+from flask_chatbot import app
+
+if __name__ == "__main__":
+    app.run()